@@ -10,17 +10,20 @@ Usage:
 import os
 
 _supabase_client = None
+_client_failed = False  # Import/creation failed; don't retry (and re-log) on every call
 
 
 def get_supabase_client():
     """
     Get shared Supabase client instance (lazy-loaded singleton).
-    Returns None if credentials not configured.
+    Returns None if credentials not configured or the client could not be created.
     """
-    global _supabase_client
+    global _supabase_client, _client_failed
 
     if _supabase_client is not None:
         return _supabase_client
+    if _client_failed:
+        return None
 
     url = os.getenv('SUPABASE_URL')
     key = os.getenv('SUPABASE_KEY') or os.getenv('SUPABASE_SERVICE_KEY') or os.getenv('SUPABASE_ANON_KEY')
@@ -34,13 +37,14 @@ def get_supabase_client():
         return _supabase_client
     except ImportError:
         print("[SupabaseClient] supabase-py not installed. Run: pip install supabase")
-        return None
     except Exception as e:
         print(f"[SupabaseClient] Failed to create client: {e}")
-        return None
+    _client_failed = True
+    return None
 
 
 def reset_client():
     """Reset the singleton (useful for testing)."""
-    global _supabase_client
+    global _supabase_client, _client_failed
     _supabase_client = None
+    _client_failed = False
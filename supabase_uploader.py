@@ -21,6 +21,13 @@ TIMEZONE HANDLING (Critical for GitHub Actions):
     - This ensures "04/02/2026 09:24:56" → "2026-02-04T09:24:56-03:00"
     - PostgreSQL stores as UTC: 2026-02-04T12:24:56Z
     - Display with AT TIME ZONE 'America/Sao_Paulo' → 09:24:56 (correct!)
+
+BATCH SIZES:
+    - BATCH_SIZE (env SUPABASE_BATCH_SIZE, default 1000, minimum 1) rows per table upsert request
+    - RPC_BATCH_SIZE (500) customers per upsert_customer_profiles_batch call;
+      PostgREST RPC bodies have tighter limits than table upserts
+    - Larger batches amortize the request round trip and per-statement planning
+      cost; Postgres ingest throughput plateaus around 1000 rows per batch
 """
 
 # CRITICAL: Set timezone to Brazil BEFORE any datetime-related imports
@@ -39,16 +46,40 @@ import re
 import csv
 import hashlib
 import logging
+import threading
 from datetime import datetime, timezone
-from typing import Dict, List, Optional, Any
+from functools import lru_cache
+from itertools import chain
+from operator import itemgetter
+from typing import Dict, List, Optional, Any, Tuple
 
 from supabase_client import get_supabase_client
 
 # Configuration
-BATCH_SIZE = 100
+BATCH_SIZE = max(1, int(os.environ.get('SUPABASE_BATCH_SIZE', 1000)))  # 0/negative would skip or break uploads
+RPC_BATCH_SIZE = 500
 DEFAULT_CASHBACK_RATE = 0.075  # 7.5%
 DEFAULT_CASHBACK_START_DATE = '2024-06-01'
 
+# CSV columns read by each upload, in the order the row loops unpack them
+SALES_CSV_FIELDS = [
+    'Data_Hora', 'Doc_Cliente', 'Valor_Venda', 'Valor_Pago', 'Maquinas', 'Meio_de_Pagamento',
+    'Comprovante_cartao', 'Bandeira_Cartao', 'Loja', 'Nome_Cliente', 'Telefone',
+    'Usou_Cupom', 'Codigo_Cupom'
+]
+CUSTOMER_CSV_FIELDS = [
+    'Documento', 'Nome', 'Telefone', 'Email', 'Data_Cadastro', 'Data_Ultima_Compra',
+    'Saldo_Carteira', 'Quantidade_Compras', 'Total_Compras'
+]
+
+# Precompiled patterns for the per-file / per-row cleaners
+_IMT_PREFIX_RE = re.compile(r'^IMTString\(\d+\):\s*')
+_NON_DIGIT_RE = re.compile(r'\D')
+
+# Single-shot constructor, bound once for the per-row import hash.
+# Don't switch to hashlib.new('sha256'): it resolves the name on every call and is slower.
+_sha256 = hashlib.sha256
+
 # Log timezone info on module load (helps debug GitHub Actions issues)
 _tz_info = os.environ.get('TZ', 'NOT SET')
 _local_now = datetime.now()
@@ -61,25 +92,39 @@ logging.info(f"[Timezone] UTC offset: {(_local_now - _utc_now.replace(tzinfo=Non
 # Cache for app settings
 _app_settings_cache = None
 _app_settings_cache_time = 0
+_app_settings_cache_hits = 0
+_app_settings_lock = threading.Lock()
 APP_SETTINGS_CACHE_TTL = 300  # 5 minutes
 
 
 # ============== SETTINGS ==============
 
-def get_app_settings() -> Dict[str, Any]:
+def get_app_settings(force_refresh: bool = False) -> Dict[str, Any]:
     """
     Fetch cashback settings from Supabase app_settings table.
-    Caches result for 5 minutes to reduce API calls.
+    Caches result for 5 minutes to reduce API calls; force_refresh=True bypasses the cache.
+    Thread-safe: concurrent callers on a cold cache wait for a single fetch.
     """
-    global _app_settings_cache, _app_settings_cache_time
+    global _app_settings_cache_hits
+
+    with _app_settings_lock:
+        # Return cached if fresh
+        if (not force_refresh and _app_settings_cache
+                and (time.time() - _app_settings_cache_time) < APP_SETTINGS_CACHE_TTL):
+            _app_settings_cache_hits += 1
+            return _app_settings_cache
+
+        return _load_app_settings()
 
-    # Return cached if fresh
-    if _app_settings_cache and (time.time() - _app_settings_cache_time) < APP_SETTINGS_CACHE_TTL:
-        return _app_settings_cache
+
+def _load_app_settings() -> Dict[str, Any]:
+    """Query app_settings and refresh the cache. Caller holds _app_settings_lock."""
+    global _app_settings_cache, _app_settings_cache_time
 
     defaults = {
         'cashback_percent': DEFAULT_CASHBACK_RATE * 100,  # 7.5
-        'cashback_start_date': DEFAULT_CASHBACK_START_DATE
+        'cashback_start_date': DEFAULT_CASHBACK_START_DATE,
+        'cashback_start_iso': DEFAULT_CASHBACK_START_DATE
     }
 
     try:
@@ -90,12 +135,22 @@ def get_app_settings() -> Dict[str, Any]:
         result = client.table('app_settings').select('*').eq('id', 'default').single().execute()
 
         if result.data:
+            cashback_start_date = result.data.get('cashback_start_date', DEFAULT_CASHBACK_START_DATE)
+            # Validated and zero-padded once here; sales rows compare against it as a string.
+            # A bad date falls back on its own - the configured percent is still used.
+            try:
+                cashback_start_iso = datetime.strptime(cashback_start_date, '%Y-%m-%d').strftime('%Y-%m-%d')
+            except (TypeError, ValueError):
+                logging.warning(f"[AppSettings] Invalid cashback_start_date {cashback_start_date!r}, using {DEFAULT_CASHBACK_START_DATE}")
+                cashback_start_iso = DEFAULT_CASHBACK_START_DATE
+
             _app_settings_cache = {
                 'cashback_percent': float(result.data.get('cashback_percent', 7.5)),
-                'cashback_start_date': result.data.get('cashback_start_date', DEFAULT_CASHBACK_START_DATE)
+                'cashback_start_date': cashback_start_date,
+                'cashback_start_iso': cashback_start_iso
             }
             _app_settings_cache_time = time.time()
-            logging.info(f"[AppSettings] Loaded: {_app_settings_cache['cashback_percent']}% cashback from {_app_settings_cache['cashback_start_date']}")
+            logging.info(f"[AppSettings] Loaded: {_app_settings_cache['cashback_percent']}% cashback from {_app_settings_cache['cashback_start_date']} ({_app_settings_cache_hits} cache hits so far)")
             return _app_settings_cache
 
     except Exception as e:
@@ -109,7 +164,7 @@ def get_app_settings() -> Dict[str, Any]:
 def clean_csv(text: str) -> str:
     """Remove BOM and IMTString prefix from CSV text."""
     text = text.lstrip('\ufeff')  # BOM
-    text = re.sub(r'^IMTString\(\d+\):\s*', '', text)
+    text = _IMT_PREFIX_RE.sub('', text)
     return text.strip()
 
 
@@ -121,21 +176,64 @@ def detect_delimiter(text: str) -> str:
     return ';' if semicolons > commas else ','
 
 
+def _csv_lines(f):
+    """
+    Non-blank lines of an open CSV file, header first with BOM/IMTString prefix removed,
+    plus the detected delimiter. Streams the file: no full-text copies.
+    Line endings are dropped, so a newline inside a quoted field joins its two halves
+    ("x<newline>y" -> "xy") - key fields keep hashing as they always have.
+    """
+    lines = (line.rstrip('\n') for line in f if line.strip())
+
+    # First non-blank line (after BOM/IMTString prefix) is the header
+    for line in lines:
+        header = clean_csv(line)
+        if header:
+            return chain([header], lines), detect_delimiter(header)
+    return iter(()), ','
+
+
 def parse_csv_file(filepath: str) -> List[Dict[str, str]]:
     """Parse CSV file to list of row dictionaries."""
     with open(filepath, 'r', encoding='utf-8-sig') as f:
-        text = f.read()
-
-    text = clean_csv(text)
-    delimiter = detect_delimiter(text)
+        lines, delimiter = _csv_lines(f)
+        # Parse with csv module for proper quote handling
+        return list(csv.DictReader(lines, delimiter=delimiter))
 
-    lines = [line for line in text.split('\n') if line.strip()]
-    if not lines:
-        return []
 
-    # Parse with csv module for proper quote handling
-    reader = csv.DictReader(lines, delimiter=delimiter)
-    return list(reader)
+def parse_csv_columns(filepath: str, fields: List[str]) -> List[Tuple[str, ...]]:
+    """
+    Parse CSV file to one tuple per row holding only `fields`, in that order.
+    Columns missing from the header and short rows read as ''. Cheaper than
+    parse_csv_file: no dict per row, column positions are resolved once.
+    """
+    with open(filepath, 'r', encoding='utf-8-sig') as f:
+        lines, delimiter = _csv_lines(f)
+        reader = csv.reader(lines, delimiter=delimiter)
+
+        header = next(reader, None)
+        if header is None:
+            return []
+        width = len(header)
+        index = {name: i for i, name in enumerate(header)}
+
+        # Rows are normalized to width + 1 cells; the extra '' cell backs absent columns
+        positions = [index.get(name, width) for name in fields]
+        if len(positions) == 1:  # itemgetter would return a bare cell, not a 1-tuple
+            position = positions[0]
+            pick = lambda row: (row[position],)
+        else:
+            pick = itemgetter(*positions)
+        padding = [''] * width
+        records = []
+        for row in reader:
+            if not row:
+                continue
+            if len(row) != width:
+                row = (row + padding)[:width]
+            row.append('')
+            records.append(pick(row))
+        return records
 
 
 # ============== BRAZILIAN FORMAT PARSERS ==============
@@ -194,10 +292,23 @@ def parse_br_date_only(date_str: str) -> Optional[str]:
     return None
 
 
+@lru_cache(maxsize=1024)
+def validate_iso_date(date_part: str) -> str:
+    """
+    Check a "YYYY-MM-DD" string is a real date (raises ValueError if not) and return it.
+    Cached: an export spans a few hundred distinct days.
+    """
+    datetime.strptime(date_part, '%Y-%m-%d')
+    return date_part
+
+
+@lru_cache(maxsize=4096)
 def parse_br_number(value: str) -> float:
     """
     Parse Brazilian number format to float.
     Examples: "1.234,56" -> 1234.56, "1,5" -> 1.5
+
+    Cached: exports repeat a few hundred distinct prices across thousands of rows.
     """
     if value is None or value == '':
         return 0.0
@@ -216,15 +327,18 @@ def parse_br_number(value: str) -> float:
     return float(s) if s else 0.0
 
 
+@lru_cache(maxsize=8192)
 def normalize_cpf(doc: str) -> str:
     """
     Normalize CPF to 11-digit string.
     Removes non-digits, pads with zeros if needed.
+
+    Cached: the same customers appear on many sales rows.
     """
     if not doc:
         return ''
 
-    digits = re.sub(r'\D', '', str(doc))
+    digits = _NON_DIGIT_RE.sub('', str(doc))
     if not digits:
         return ''
 
@@ -247,8 +361,18 @@ def count_machines(machine_str: str) -> Dict[str, int]:
     """
     if not machine_str:
         return {'wash': 0, 'dry': 0, 'total': 0}
+    return count_machines_lower(machine_str.lower())
+
 
-    machines = machine_str.lower().split(',')
+def count_machines_lower(machine_lower: str) -> Dict[str, int]:
+    """count_machines() for a string the caller already lowercased."""
+    # Single machine (the common case) or empty: no list to build
+    if ',' not in machine_lower:
+        wash = 1 if 'lavadora' in machine_lower else 0
+        dry = 1 if 'secadora' in machine_lower else 0
+        return {'wash': wash, 'dry': dry, 'total': wash + dry}
+
+    machines = machine_lower.split(',')
     wash = sum(1 for m in machines if 'lavadora' in m)
     dry = sum(1 for m in machines if 'secadora' in m)
 
@@ -263,34 +387,48 @@ def classify_transaction(row: Dict[str, str]) -> str:
     - TYPE_3: Recarga (wallet recharge)
     - UNKNOWN: Cannot classify
     """
-    machine_str = str(row.get('Maquinas', '')).lower()
-    payment_method = str(row.get('Meio_de_Pagamento', '')).lower()
-    gross_value = parse_br_number(row.get('Valor_Venda', '0'))
+    return classify_values(
+        str(row.get('Maquinas', '')).lower(),
+        str(row.get('Meio_de_Pagamento', '')).lower(),
+        parse_br_number(row.get('Valor_Venda', '0'))
+    )
+
 
+def classify_values(machine_lower: str, payment_lower: str, gross_value: float) -> str:
+    """classify_transaction() on fields the caller already lowercased/parsed."""
     # TYPE_3: Wallet recharge
-    if 'recarga' in machine_str:
+    if 'recarga' in machine_lower:
         return 'TYPE_3'
 
-    # TYPE_2: Wallet purchase
-    if 'saldo da carteira' in payment_method:
+    # TYPE_2: Wallet purchase (recarga already excluded above)
+    if 'saldo da carteira' in payment_lower:
         return 'TYPE_2'
-    if gross_value == 0 and machine_str and 'recarga' not in machine_str:
+    if gross_value == 0 and machine_lower:
         return 'TYPE_2'
 
     # TYPE_1: Normal purchase
-    if machine_str and 'recarga' not in machine_str and gross_value > 0:
+    if machine_lower and gross_value > 0:
         return 'TYPE_1'
 
     return 'UNKNOWN'
 
 
+def import_key(data_hora: str, doc_cliente: str, valor_venda: str, maquinas: str) -> str:
+    """Raw dedup key (the hashed content) - equal keys produce equal import hashes."""
+    return f"{data_hora}|{doc_cliente}|{valor_venda}|{maquinas}"
+
+
+def hash_import_key(key: str) -> str:
+    """SHA-256 of an import key, first 32 hex characters."""
+    return _sha256(key.encode()).hexdigest()[:32]
+
+
 def generate_hash(data_hora: str, doc_cliente: str, valor_venda: str, maquinas: str) -> str:
     """
     Generate SHA-256 hash for deduplication.
     Returns first 32 hex characters.
     """
-    content = f"{data_hora}|{doc_cliente}|{valor_venda}|{maquinas}"
-    return hashlib.sha256(content.encode()).hexdigest()[:32]
+    return hash_import_key(import_key(data_hora, doc_cliente, valor_venda, maquinas))
 
 
 # ============== UPLOAD HISTORY ==============
@@ -367,10 +505,10 @@ def upload_sales_csv(filepath: str, source: str = 'automated_upload') -> Dict[st
         # Load settings
         settings = get_app_settings()
         cashback_rate = settings['cashback_percent'] / 100  # Convert 7.5 to 0.075
-        cashback_start = datetime.strptime(settings['cashback_start_date'], '%Y-%m-%d')
+        cashback_start = settings['cashback_start_iso']  # YYYY-MM-DD; ISO dates sort lexicographically
 
         # Parse CSV
-        rows = parse_csv_file(filepath)
+        rows = parse_csv_columns(filepath, SALES_CSV_FIELDS)
         result['total'] = len(rows)
 
         if not rows:
@@ -379,46 +517,46 @@ def upload_sales_csv(filepath: str, source: str = 'automated_upload') -> Dict[st
 
         # Process rows
         transactions = []
-        seen_hashes = set()
+        seen_keys = set()  # 64-bit hash(key) ints, not the key strings (smaller set, int compares)
 
         for i, row in enumerate(rows):
             try:
+                (raw_data_hora, raw_doc, raw_valor_venda, raw_valor_pago, machine_str, payment,
+                 comprovante, bandeira, loja, nome, telefone, raw_usou_cupom, codigo_cupom) = row
+
                 # Parse date
-                data_hora = parse_br_date(row.get('Data_Hora'))
+                data_hora = parse_br_date(raw_data_hora)
                 if not data_hora:
                     result['skipped'] += 1
                     continue
 
                 # Normalize CPF
-                doc_cliente = normalize_cpf(row.get('Doc_Cliente'))
+                doc_cliente = normalize_cpf(raw_doc)
                 if not doc_cliente:
                     result['skipped'] += 1
                     continue
 
                 # Values
-                gross_value = parse_br_number(row.get('Valor_Venda', '0'))
-                paid_value = parse_br_number(row.get('Valor_Pago', '0'))
-                machine_str = row.get('Maquinas', '')
-
-                # Generate dedup hash
-                import_hash = generate_hash(
-                    row.get('Data_Hora', ''),
-                    row.get('Doc_Cliente', ''),
-                    row.get('Valor_Venda', ''),
-                    machine_str
-                )
-
-                if import_hash in seen_hashes:
+                gross_value = parse_br_number(raw_valor_venda)
+                paid_value = parse_br_number(raw_valor_pago)
+
+                # Dedup within the file on the raw key; only first occurrences get hashed
+                key = import_key(raw_data_hora, raw_doc, raw_valor_venda, machine_str)
+
+                key_id = hash(key)
+                if key_id in seen_keys:
                     continue
-                seen_hashes.add(import_hash)
+                seen_keys.add(key_id)
+                import_hash = hash_import_key(key)
 
-                # Classify transaction
-                tx_type = classify_transaction(row)
-                is_recarga = 'recarga' in machine_str.lower()
-                machine_info = count_machines(machine_str)
+                # Classify transaction - one lowercase of Maquinas feeds all machine-derived fields
+                machine_lower = machine_str.lower()
+                is_recarga = 'recarga' in machine_lower
+                tx_type = classify_values(machine_lower, payment.lower(), gross_value)
+                machine_info = count_machines_lower(machine_lower)
 
-                # Calculate cashback
-                tx_date = datetime.strptime(data_hora.split('T')[0], '%Y-%m-%d')
+                # Calculate cashback (validated YYYY-MM-DD dates compare correctly as strings)
+                tx_date = validate_iso_date(data_hora.split('T')[0])
                 cashback_amount = 0.0
                 net_value = paid_value
 
@@ -427,8 +565,7 @@ def upload_sales_csv(filepath: str, source: str = 'automated_upload') -> Dict[st
                     net_value = round(paid_value - cashback_amount, 2)
 
                 # Parse coupon
-                usou_cupom = str(row.get('Usou_Cupom', '')).lower() == 'sim'
-                codigo_cupom = row.get('Codigo_Cupom', '')
+                usou_cupom = raw_usou_cupom.lower() == 'sim'
                 if codigo_cupom and codigo_cupom.lower() != 'n/d':
                     codigo_cupom = codigo_cupom.strip().upper()
                 else:
@@ -438,13 +575,13 @@ def upload_sales_csv(filepath: str, source: str = 'automated_upload') -> Dict[st
                     'data_hora': data_hora,
                     'valor_venda': gross_value,
                     'valor_pago': paid_value,
-                    'meio_de_pagamento': row.get('Meio_de_Pagamento') or None,
-                    'comprovante_cartao': row.get('Comprovante_cartao') or None,
-                    'bandeira_cartao': row.get('Bandeira_Cartao') or None,
-                    'loja': row.get('Loja') or None,
-                    'nome_cliente': row.get('Nome_Cliente') or None,
+                    'meio_de_pagamento': payment or None,
+                    'comprovante_cartao': comprovante or None,
+                    'bandeira_cartao': bandeira or None,
+                    'loja': loja or None,
+                    'nome_cliente': nome or None,
                     'doc_cliente': doc_cliente,
-                    'telefone': row.get('Telefone') or None,
+                    'telefone': telefone or None,
                     'maquinas': machine_str or None,
                     'usou_cupom': usou_cupom,
                     'codigo_cupom': codigo_cupom,
@@ -462,11 +599,13 @@ def upload_sales_csv(filepath: str, source: str = 'automated_upload') -> Dict[st
             except Exception as e:
                 result['errors'].append(f"Row {i + 1}: {str(e)}")
 
-        # Batch upsert
+        # Batch upsert - serial on purpose: trg_update_customer_after_transaction updates
+        # customers for every inserted row, so concurrent batches sharing a doc_cliente
+        # would contend on (or deadlock over) the same customer row locks
         for i in range(0, len(transactions), BATCH_SIZE):
             batch = transactions[i:i + BATCH_SIZE]
             try:
-                response = client.table('transactions').upsert(
+                client.table('transactions').upsert(
                     batch,
                     on_conflict='import_hash'
                 ).execute()
@@ -517,51 +656,57 @@ def upload_customers_csv(filepath: str, source: str = 'automated_upload') -> Dic
             return result
 
         # Parse CSV
-        rows = parse_csv_file(filepath)
+        rows = parse_csv_columns(filepath, CUSTOMER_CSV_FIELDS)
         result['total'] = len(rows)
 
         if not rows:
             result['success'] = True
             return result
 
-        # Deduplicate by CPF
-        customer_map = {}
-
+        # Deduplicate by CPF before parsing: the last row per CPF wins,
+        # customers keep the order in which their CPF first appears
+        latest_row = {}
         for i, row in enumerate(rows):
+            doc = normalize_cpf(row[0])
+            if doc:
+                latest_row[doc] = i
+            else:
+                result['skipped'] += 1
+
+        customers = []
+
+        for doc, i in latest_row.items():
             try:
-                doc = normalize_cpf(row.get('Documento'))
-                if not doc:
-                    result['skipped'] += 1
-                    continue
+                (_, nome, telefone, email, raw_cadastro, raw_ultima_compra,
+                 raw_saldo, raw_quantidade, raw_total) = rows[i]
 
                 # Parse dates
-                data_cadastro = parse_br_date(row.get('Data_Cadastro'))
-                first_visit = parse_br_date_only(row.get('Data_Cadastro'))
-                last_visit = parse_br_date_only(row.get('Data_Ultima_Compra'))
+                data_cadastro = parse_br_date(raw_cadastro)
+                first_visit = parse_br_date_only(raw_cadastro)
+                last_visit = parse_br_date_only(raw_ultima_compra)
 
-                customer_map[doc] = {
+                customers.append({
                     'doc': doc,
-                    'nome': row.get('Nome') or None,
-                    'telefone': row.get('Telefone') or None,
-                    'email': row.get('Email') or None,
+                    'nome': nome or None,
+                    'telefone': telefone or None,
+                    'email': email or None,
                     'data_cadastro': data_cadastro,
-                    'saldo_carteira': parse_br_number(row.get('Saldo_Carteira', '0')),
+                    'saldo_carteira': parse_br_number(raw_saldo),
                     'first_visit': first_visit,
                     'last_visit': last_visit,
-                    'transaction_count': int(row.get('Quantidade_Compras', '0') or 0),
-                    'total_spent': parse_br_number(row.get('Total_Compras', '0')),
+                    'transaction_count': int(raw_quantidade or 0),
+                    'total_spent': parse_br_number(raw_total),
                     'source': source
-                }
+                })
 
             except Exception as e:
                 result['errors'].append(f"Row {i + 1}: {str(e)}")
 
-        customers = list(customer_map.values())
         use_smart_upsert = True
 
         # Batch upload
-        for i in range(0, len(customers), BATCH_SIZE):
-            batch = customers[i:i + BATCH_SIZE]
+        for i in range(0, len(customers), RPC_BATCH_SIZE):
+            batch = customers[i:i + RPC_BATCH_SIZE]
 
             if use_smart_upsert:
                 try:
@@ -582,7 +727,7 @@ def upload_customers_csv(filepath: str, source: str = 'automated_upload') -> Dic
                         logging.info("[CustomerUpload] Smart upsert not available, using simple upsert")
                         use_smart_upsert = False
                     else:
-                        result['errors'].append(f"Batch {i // BATCH_SIZE}: {error_msg}")
+                        result['errors'].append(f"Batch {i // RPC_BATCH_SIZE}: {error_msg}")
                         continue
 
             # Fallback: Simple upsert
@@ -594,7 +739,7 @@ def upload_customers_csv(filepath: str, source: str = 'automated_upload') -> Dic
                     ).execute()
                     result['inserted'] += len(batch)
                 except Exception as e:
-                    result['errors'].append(f"Batch {i // BATCH_SIZE}: {str(e)}")
+                    result['errors'].append(f"Batch {i // RPC_BATCH_SIZE}: {str(e)}")
 
         result['success'] = len(result['errors']) == 0
 
@@ -644,15 +789,17 @@ def detect_file_type(filepath: str) -> str:
     Returns: 'sales', 'customer', or 'unknown'
     """
     try:
+        # Same header the parsers project columns from (skips blank lines/IMTString prefix)
         with open(filepath, 'r', encoding='utf-8-sig') as f:
-            first_line = f.readline().lower()
+            lines, _ = _csv_lines(f)
+            header = next(lines, '').lower()
 
         # Sales file indicators
-        if 'data_hora' in first_line or 'maquinas' in first_line:
+        if 'data_hora' in header or 'maquinas' in header:
             return 'sales'
 
         # Customer file indicators
-        if 'documento' in first_line or 'saldo_carteira' in first_line:
+        if 'documento' in header or 'saldo_carteira' in header:
             return 'customer'
 
         return 'unknown'